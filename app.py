@@ -3,14 +3,18 @@ import json
 import subprocess
 import os
 import sys
-import shutil
-from geopy.distance import distance as geopy_distance
-from geopy.point import Point
-import requests
+import numpy as np
 from generate_snapshots import generate_snapshots
 
 app = Flask(__name__)
 
+def _count_dir(path, suffix='.png'):
+    """Count matching directory entries without materializing a list of
+    filenames. Filtering by suffix keeps derived files (e.g. the vision
+    system's .orb.npz feature caches) out of the snapshot count."""
+    with os.scandir(path) as entries:
+        return sum(1 for entry in entries if entry.name.endswith(suffix))
+
 @app.route('/')
 def index():
     return send_from_directory('.', 'index.html')
@@ -33,61 +37,65 @@ def run_simulation():
     with open('route.json', 'w') as f:
         json.dump(waypoints, f, indent=4)
 
-    # --- Generate Ground Truth Map ---
+    # --- Generate Ground Truth Map and Waypoint Snapshots ---
     print("\n--- Generating Satellite Ground Truth Map ---")
     drone_feed_path = os.path.join("assets", "drone_feed.png")
     # Ensure the assets directory exists before writing the image
     os.makedirs(os.path.dirname(drone_feed_path), exist_ok=True)
-    try:
-        buffer = 0.001
-        route_min_lat = min(wp['lat'] for wp in waypoints) - buffer
-        route_max_lat = max(wp['lat'] for wp in waypoints) + buffer
-        route_min_lon = min(wp['lon'] for wp in waypoints) - buffer
-        route_max_lon = max(wp['lon'] for wp in waypoints) + buffer
-
-        route_bbox = f"{route_min_lon},{route_min_lat},{route_max_lon},{route_max_lat}"
-        width = 1500
-        height = int(width * (route_max_lat - route_min_lat) / (route_max_lon - route_min_lon))
-
-        params = {
-            'bbox': route_bbox, 'bboxSR': 4326, 'size': f'{width},{height}',
-            'imageSR': 4326, 'format': 'png', 'transparent': 'false', 'f': 'image'
-        }
-        IMAGERY_URL = "https://services.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/export"
-        response = requests.get(IMAGERY_URL, params=params, timeout=30)
-        response.raise_for_status()
-
-        with open(drone_feed_path, 'wb') as f:
-            f.write(response.content)
-        print(f" -> Saved satellite ground truth map to {drone_feed_path}")
-
-        map_meta = {'bbox': [route_min_lon, route_min_lat, route_max_lon, route_max_lat]}
-        with open('map_meta.json', 'w') as f:
-            json.dump(map_meta, f)
-        print(" -> Saved map metadata to map_meta.json")
-
-    except requests.exceptions.RequestException as e:
-        print(f"\n--- Ground Truth Map Generation Failed ---")
-        print(f"Could not fetch satellite map: {e}")
-        return jsonify({"message": f"Failed to generate ground truth map: {e}"}), 500
-
-    # --- Generate Satellite Snapshots ---
-    generate_snapshots()
+
+    buffer = 0.001
+    # Single-pass numpy reduction instead of four generator passes
+    coords = np.array([(wp['lat'], wp['lon']) for wp in waypoints], dtype=np.float64)
+    route_min_lat, route_min_lon = coords.min(axis=0) - buffer
+    route_max_lat, route_max_lon = coords.max(axis=0) + buffer
+
+    route_bbox = f"{route_min_lon},{route_min_lat},{route_max_lon},{route_max_lat}"
+    width = 1500
+    height = int(width * (route_max_lat - route_min_lat) / (route_max_lon - route_min_lon))
+
+    map_params = {
+        'bbox': route_bbox, 'bboxSR': 4326, 'size': f'{width},{height}',
+        'imageSR': 4326, 'format': 'png', 'transparent': 'false', 'f': 'image'
+    }
+
+    map_meta = {'bbox': [route_min_lon, route_min_lat, route_max_lon, route_max_lat]}
+    with open('map_meta.json', 'w') as f:
+        json.dump(map_meta, f)
+    print(" -> Saved map metadata to map_meta.json")
+
+    # Remove any stale map so the verification below reflects this run's fetch
+    if os.path.exists(drone_feed_path):
+        os.remove(drone_feed_path)
+
+    # The ground-truth map is fetched through the same thread pool and session
+    # as the waypoint snapshots: one batched round of concurrent ArcGIS
+    # requests covers everything, and the route is passed in directly instead
+    # of being re-read from route.json.
+    generate_snapshots(waypoints, extra_jobs=[(map_params, drone_feed_path)])
 
     # --- VERIFY ASSET GENERATION ---
     print("\n--- Verifying Required Assets ---")
     satellite_snapshot_dir = os.path.join("assets", "waypoint_snapshots")
     expected_snapshots = len(waypoints) - 1
     
-    # Check for ground truth map
-    if not os.path.exists(drone_feed_path) or os.path.getsize(drone_feed_path) == 0:
+    # Check for ground truth map: one stat covers both existence and size
+    try:
+        map_ok = os.stat(drone_feed_path).st_size > 0
+    except FileNotFoundError:
+        map_ok = False
+    if not map_ok:
         error_msg = "Verification Failed: Ground truth map (drone_feed.png) was not created. The selected route may be invalid."
         print(f"ERROR: {error_msg}")
         return jsonify({"message": error_msg}), 500
 
-    # Check for waypoint snapshots
-    if not os.path.exists(satellite_snapshot_dir) or len(os.listdir(satellite_snapshot_dir)) != expected_snapshots:
-        error_msg = f"Verification Failed: Expected {expected_snapshots} waypoint snapshots, but found {len(os.listdir(satellite_snapshot_dir))}. Try a different route."
+    # Check for waypoint snapshots: one scandir pass covers both the
+    # existence check and the count
+    try:
+        found_snapshots = _count_dir(satellite_snapshot_dir)
+    except FileNotFoundError:
+        found_snapshots = 0
+    if found_snapshots != expected_snapshots:
+        error_msg = f"Verification Failed: Expected {expected_snapshots} waypoint snapshots, but found {found_snapshots}. Try a different route."
         print(f"ERROR: {error_msg}")
         return jsonify({"message": error_msg}), 500
     
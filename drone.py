@@ -2,13 +2,63 @@
 
 import pygame
 import math
+import numpy as np
 from typing import Tuple, Optional
-from geopy.distance import geodesic
-from geopy.point import Point
 from enum import Enum, auto
-from navigation import calculate_bearing
 import time
 
+# Mean Earth radius in meters (IUGG)
+EARTH_RADIUS_M = 6371008.8
+
+# Meters per degree of latitude, for flat-earth conversions over the short
+# distances of the spiral search (exact to millimeters at a 20m radius).
+METERS_PER_DEG_LAT = 111320.0
+
+def _destination(lat: float, lon: float, bearing_deg: float, distance_m: float) -> Tuple[float, float]:
+    """
+    Compute the destination point given a start, an initial bearing and a
+    distance, using the closed-form spherical formula.
+
+    geopy's geodesic solver is iterative and far too slow to call several
+    times per frame; for the sub-100m steps the simulation takes each frame,
+    the spherical approximation is accurate to centimeters.
+    """
+    lat1 = math.radians(lat)
+    lon1 = math.radians(lon)
+    bearing = math.radians(bearing_deg)
+    angular_dist = distance_m / EARTH_RADIUS_M
+
+    sin_lat1 = math.sin(lat1)
+    cos_lat1 = math.cos(lat1)
+    sin_ad = math.sin(angular_dist)
+    cos_ad = math.cos(angular_dist)
+
+    lat2 = math.asin(sin_lat1 * cos_ad + cos_lat1 * sin_ad * math.cos(bearing))
+    lon2 = lon1 + math.atan2(math.sin(bearing) * sin_ad * cos_lat1,
+                             cos_ad - sin_lat1 * math.sin(lat2))
+
+    return math.degrees(lat2), math.degrees(lon2)
+
+# Structured layout of the per-drone physical state. Kept in a single numpy
+# record array (structure-of-arrays) so a multi-drone simulation can update
+# whole columns — positions, headings, batteries — with vectorized arithmetic
+# instead of per-drone Python attribute math.
+DRONE_STATE_DTYPE = np.dtype([
+    ('lat', 'f8'), ('lon', 'f8'), ('z', 'f4'),
+    ('heading', 'f4'), ('vel', 'f4'), ('battery', 'f4'),
+])
+
+class DroneFleet:
+    """
+    Owner of the batched physical state for one or more drones.
+
+    Each Drone is a thin view into one row of `state`; batch extensions can
+    propagate every drone's position in one vectorized pass over the columns
+    rather than looping over Drone objects.
+    """
+    def __init__(self, size: int = 1):
+        self.state = np.zeros(size, dtype=DRONE_STATE_DTYPE)
+
 class DroneState(Enum):
     IDLE = 0
     TAKING_OFF = 1
@@ -21,14 +71,29 @@ class DroneState(Enum):
     LANDED = 8
 
 class Drone:
-    def __init__(self, start_pos_lat_lon: Tuple[float, float], start_alt: float):
+    # Precomputed (dx, dy) offsets of the 12-pixel heading indicator for each
+    # integer-degree heading. Only 360 positions are visually distinct, so the
+    # render loop can use a table lookup instead of per-frame trig.
+    _heading_lut = [(12 * math.cos(math.radians(-h + 90)),
+                     -12 * math.sin(math.radians(-h + 90))) for h in range(360)]
+
+    def __init__(self, start_pos_lat_lon: Tuple[float, float], start_alt: float,
+                 fleet: Optional[DroneFleet] = None, index: int = 0):
         """
         Initialize the drone's state with geographic coordinates.
-        
+
         Args:
             start_pos_lat_lon: Tuple of (latitude, longitude) starting position.
             start_alt: Starting altitude in meters.
+            fleet: Optional shared DroneFleet holding the physical state;
+                a private single-row fleet is created when omitted.
+            index: This drone's row in the fleet's state array.
         """
+        # Physical state lives in the (possibly shared) fleet array; the
+        # properties below read and write this drone's row of it.
+        self._fleet = fleet if fleet is not None else DroneFleet(1)
+        self._row = self._fleet.state[index]
+
         self.start_pos_lat_lon = start_pos_lat_lon # Home position
         self.lat, self.lon = start_pos_lat_lon
         self.z = 0  # Start at ground level
@@ -54,11 +119,22 @@ class Drone:
         # Search state parameters
         self.search_start_time = 0
         self.max_search_radius = 20.0  # meters
-        self.search_angle = 0
         self.search_center_lat = 0
         self.search_center_lon = 0
         self.total_search_time = 0 # Total time spent in search for a single waypoint
 
+        # State dispatch table: update() resolves the active state's handler
+        # with one dict lookup on pre-bound methods.
+        self._handlers = {
+            DroneState.TAKING_OFF: self._tick_taking_off,
+            DroneState.NAVIGATING: self._tick_navigating,
+            DroneState.HOVERING: self._tick_hovering,
+            DroneState.SEARCHING: self._tick_searching,
+            DroneState.MATCH_FOUND: self._tick_match_found,
+            DroneState.RETURN_HOME: self._tick_return_home,
+            DroneState.LANDING: self._tick_landing,
+        }
+
         print(f"Drone initialized at: (Lat: {self.lat:.4f}, Lon: {self.lon:.4f}). State: {self.state.name}")
 
     def set_bearing(self, bearing: float):
@@ -75,137 +151,165 @@ class Drone:
             return
 
         # --- State Logic ---
-        if self.state == DroneState.TAKING_OFF:
-            self.altitude += self.ascent_speed * dt
-            if self.altitude >= self.cruise_altitude:
-                self.altitude = self.cruise_altitude
-                self.state = DroneState.NAVIGATING
-                print(f"Cruise altitude reached. State changed to: {self.state.name}")
-        
-        elif self.state == DroneState.NAVIGATING:
-            if nav_system.reached_destination:
-                # This case should be handled after a successful match of the last waypoint.
-                # The drone will transition to RETURN_HOME in the MATCH_FOUND state.
-                pass
-            else:
-                if nav_system.bearing_to_wp is not None:
-                    self.heading = nav_system.bearing_to_wp
-                distance_to_wp = nav_system.distance_to_wp
-
-                # Braking logic: slow down when close to the waypoint
-                braking_distance = 30 # meters
-                if distance_to_wp < braking_distance:
-                    # Scale velocity linearly from max speed down to a minimum speed
-                    min_velocity = 3.0
-                    speed_ratio = max(0, distance_to_wp / braking_distance)
-                    current_velocity = min_velocity + (self.velocity - min_velocity) * speed_ratio
-                else:
-                    current_velocity = self.velocity
-
-                distance_this_frame = current_velocity * dt
-                distance_moved = min(distance_this_frame, distance_to_wp) if distance_to_wp is not None else distance_this_frame
-
-                if distance_moved > 0:
-                    start_point = Point(self.lat, self.lon)
-                    destination = geodesic(meters=distance_moved).destination(start_point, self.heading)
-                    self.lat, self.lon = destination.latitude, destination.longitude
-
-                if nav_system.distance_to_wp is not None and nav_system.distance_to_wp < nav_system.waypoint_threshold:
-                    self.state = DroneState.HOVERING
-                    print(f"Arrived at waypoint {nav_system.get_current_waypoint_index()}. State changed to: HOVERING")
-
-        elif self.state == DroneState.HOVERING:
-            # Hover for a short duration to stabilize for image matching
-            if time.time() - self.hover_start_time > 2: # Hover for 2 seconds
-                # The simulation_main loop will attempt a match and change the state.
-                # If it doesn't, we'll be stuck here. This is intentional.
-                pass
-
-        elif self.state == DroneState.SEARCHING:
-            self.total_search_time += dt # Increment total search time
-
-            # Execute a spiral search pattern
-            if self.search_start_time == 0: # Initialize search
-                self.search_start_time = time.time()
-                self.search_radius = 5 # Start with a 5m radius
-                self.search_angle = 0
-                self.search_center_lat, self.search_center_lon = self.lat, self.lon
-
-            # Spiral out over time
-            time_in_search = time.time() - self.search_start_time
-            if self.search_radius < self.max_search_radius:
-                self.search_radius += 1 * dt # Expand radius at 1 m/s
-            self.search_angle += 60 * dt # Rotate at 60 deg/s
-
-            # Calculate new position on the spiral
-            search_center_point = Point(self.search_center_lat, self.search_center_lon)
-            destination = geodesic(meters=self.search_radius).destination(search_center_point, self.search_angle)
-            
-            # Create a mini-navigation goal to the next point on the spiral
-            target_lat, target_lon = destination.latitude, destination.longitude
-            bearing_to_target = calculate_bearing(self.lat, self.lon, target_lat, target_lon)
-            self.heading = bearing_to_target
-
-            distance_this_frame = self.search_velocity * dt
-            start_point = Point(self.lat, self.lon)
-            new_pos = geodesic(meters=distance_this_frame).destination(start_point, self.heading)
-            self.lat, self.lon = new_pos.latitude, new_pos.longitude
-
-            # After a few seconds, return to HOVERING to re-attempt the match
-            if time_in_search > 5:
-                print("Search segment complete. Returning to HOVERING to re-attempt match.")
-                self.state = DroneState.HOVERING
-                self.hover_start_time = time.time()
-                self.search_start_time = 0 # Reset timer for the next search segment
-                return
-
-            # Failsafe: if searching for too long, abort and return to home base
-            if self.total_search_time > 30: # Max 30 seconds of total searching for a single waypoint
-                print("!! SEARCH FAILED: Could not find waypoint after extensive search.")
-                print("!! Aborting mission and returning to start point.")
-                self.state = DroneState.RETURN_HOME
-                # The navigation system is configured to handle the return journey
-                home_waypoint = {'name': 'Home', 'lat': self.start_pos_lat_lon[0], 'lon': self.start_pos_lat_lon[1]}
-                nav_system.set_new_route([home_waypoint])
-                self.total_search_time = 0 # Reset search timer
-
-        elif self.state == DroneState.MATCH_FOUND:
-            # Briefly pause to signify a successful match, then continue
-            if time.time() - self.match_found_time > 1: # Pause for 1 second
-                if nav_system.is_final_waypoint():
-                    print("Final waypoint confirmed. Initiating landing.")
-                    self.initiate_landing()
-                else:
-                    nav_system.advance_waypoint()
-                    self.state = DroneState.NAVIGATING
-
-        elif self.state == DroneState.RETURN_HOME:
-            if nav_system.reached_destination:
-                self.initiate_landing()
-            else:
-                # Standard navigation logic, but towards home
-                if nav_system.bearing_to_wp is not None:
-                    self.heading = nav_system.bearing_to_wp
-                distance_to_wp = nav_system.distance_to_wp
-                distance_this_frame = self.velocity * dt
-                distance_moved = min(distance_this_frame, distance_to_wp) if distance_to_wp is not None else distance_this_frame
-
-                if distance_moved > 0:
-                    start_point = Point(self.lat, self.lon)
-                    destination = geodesic(meters=distance_moved).destination(start_point, self.heading)
-                    self.lat, self.lon = destination.latitude, destination.longitude
-
-        elif self.state == DroneState.LANDING:
-            self.altitude -= self.descent_speed * dt
-            if self.altitude <= 0.1:
-                self.altitude = 0
-                self.state = DroneState.LANDED
-                self.velocity = 0
-                print("DRONE HAS LANDED SUCCESSFULLY!")
+        # O(1) dispatch instead of an if/elif walk over DroneState. IDLE has
+        # no per-frame behavior and is intentionally absent from the table.
+        handler = self._handlers.get(self.state)
+        if handler is not None:
+            handler(dt, nav_system)
 
         # --- Physics & Battery ---
         self.altitude = max(0, self.altitude)
         self.battery = max(0, self.battery - (self.battery_drain_rate * dt))
+
+    def _tick_taking_off(self, dt: float, nav_system):
+        self.altitude += self.ascent_speed * dt
+        if self.altitude >= self.cruise_altitude:
+            self.altitude = self.cruise_altitude
+            self.state = DroneState.NAVIGATING
+            print(f"Cruise altitude reached. State changed to: {self.state.name}")
+
+    def _tick_navigating(self, dt: float, nav_system):
+        if nav_system.reached_destination:
+            # This case should be handled after a successful match of the last waypoint.
+            # The drone will transition to RETURN_HOME in the MATCH_FOUND state.
+            return
+
+        # NavigationSystem guarantees distance_to_wp and bearing_to_wp are
+        # floats whenever reached_destination is False and update() has run
+        # this frame, so no None guards are needed on this hot path.
+        self.heading = nav_system.bearing_to_wp
+        distance_to_wp = nav_system.distance_to_wp
+
+        # Braking logic: slow down when close to the waypoint
+        braking_distance = 30 # meters
+        if distance_to_wp < braking_distance:
+            # Scale velocity linearly from max speed down to a minimum speed
+            min_velocity = 3.0
+            speed_ratio = max(0, distance_to_wp / braking_distance)
+            current_velocity = min_velocity + (self.velocity - min_velocity) * speed_ratio
+        else:
+            current_velocity = self.velocity
+
+        distance_this_frame = current_velocity * dt
+        distance_moved = min(distance_this_frame, distance_to_wp)
+
+        if distance_moved > 0:
+            self.lat, self.lon = _destination(self.lat, self.lon, self.heading, distance_moved)
+
+        if distance_to_wp < nav_system.waypoint_threshold:
+            self.state = DroneState.HOVERING
+            print(f"Arrived at waypoint {nav_system.get_current_waypoint_index()}. State changed to: HOVERING")
+
+    def _tick_hovering(self, dt: float, nav_system):
+        # Hover for a short duration to stabilize for image matching
+        if time.time() - self.hover_start_time > 2: # Hover for 2 seconds
+            # The simulation_main loop will attempt a match and change the state.
+            # If it doesn't, we'll be stuck here. This is intentional.
+            pass
+
+    def _tick_searching(self, dt: float, nav_system):
+        self.total_search_time += dt # Increment total search time
+
+        # Sample the clock once; this branch consults it several times.
+        now = time.time()
+
+        # Execute a spiral search pattern
+        if self.search_start_time == 0: # Initialize search
+            self.search_start_time = now
+            self.search_radius = 5 # Start with a 5m radius
+            self.search_center_lat, self.search_center_lon = self.lat, self.lon
+            # Local east/north offset of the spiral point from the center.
+            # It is advanced incrementally each frame instead of being
+            # re-derived from angle and radius with spherical trig.
+            self._spiral_east = 0.0
+            self._spiral_north = self.search_radius
+            self._search_cos_lat = math.cos(math.radians(self.search_center_lat))
+
+        # Spiral out over time
+        time_in_search = now - self.search_start_time
+        if self.search_radius < self.max_search_radius:
+            # Expand radius at 1 m/s, growing the offset vector to match
+            new_radius = self.search_radius + 1 * dt
+            growth = new_radius / self.search_radius
+            self._spiral_east *= growth
+            self._spiral_north *= growth
+            self.search_radius = new_radius
+
+        # Rotate at 60 deg/s (clockwise from north toward east) by applying
+        # this frame's rotation step to the cached offset vector
+        step = math.radians(60 * dt)
+        c, s = math.cos(step), math.sin(step)
+        east, north = self._spiral_east, self._spiral_north
+        self._spiral_east = c * east + s * north
+        self._spiral_north = c * north - s * east
+
+        # Convert the spiral point to lat/lon with the flat-earth scale
+        target_lat = self.search_center_lat + self._spiral_north / METERS_PER_DEG_LAT
+        target_lon = self.search_center_lon + self._spiral_east / (METERS_PER_DEG_LAT * self._search_cos_lat)
+
+        # Step toward the spiral point. The chase vector in local east/north
+        # coordinates yields both the heading and the position update in one
+        # pass, replacing the calculate_bearing + _destination pair (each of
+        # which redid a full set of spherical trig on the same coordinates).
+        east_err = (target_lon - self.lon) * (METERS_PER_DEG_LAT * self._search_cos_lat)
+        north_err = (target_lat - self.lat) * METERS_PER_DEG_LAT
+        separation = math.hypot(east_err, north_err)
+        if separation > 0:
+            self.heading = math.degrees(math.atan2(east_err, north_err)) % 360
+            step_m = self.search_velocity * dt
+            self.lat += (north_err / separation) * step_m / METERS_PER_DEG_LAT
+            self.lon += (east_err / separation) * step_m / (METERS_PER_DEG_LAT * self._search_cos_lat)
+
+        # After a few seconds, return to HOVERING to re-attempt the match
+        if time_in_search > 5:
+            print("Search segment complete. Returning to HOVERING to re-attempt match.")
+            self.state = DroneState.HOVERING
+            self.hover_start_time = now
+            self.search_start_time = 0 # Reset timer for the next search segment
+            return
+
+        # Failsafe: if searching for too long, abort and return to home base
+        if self.total_search_time > 30: # Max 30 seconds of total searching for a single waypoint
+            print("!! SEARCH FAILED: Could not find waypoint after extensive search.")
+            print("!! Aborting mission and returning to start point.")
+            self.state = DroneState.RETURN_HOME
+            # The navigation system is configured to handle the return journey
+            home_waypoint = {'name': 'Home', 'lat': self.start_pos_lat_lon[0], 'lon': self.start_pos_lat_lon[1]}
+            nav_system.set_new_route([home_waypoint])
+            self.total_search_time = 0 # Reset search timer
+
+    def _tick_match_found(self, dt: float, nav_system):
+        # Briefly pause to signify a successful match, then continue
+        if time.time() - self.match_found_time > 1: # Pause for 1 second
+            if nav_system.is_final_waypoint():
+                print("Final waypoint confirmed. Initiating landing.")
+                self.initiate_landing()
+            else:
+                nav_system.advance_waypoint()
+                self.state = DroneState.NAVIGATING
+
+    def _tick_return_home(self, dt: float, nav_system):
+        if nav_system.reached_destination:
+            self.initiate_landing()
+            return
+
+        # Standard navigation logic, but towards home
+        if nav_system.bearing_to_wp is not None:
+            self.heading = nav_system.bearing_to_wp
+        distance_to_wp = nav_system.distance_to_wp
+        distance_this_frame = self.velocity * dt
+        distance_moved = min(distance_this_frame, distance_to_wp) if distance_to_wp is not None else distance_this_frame
+
+        if distance_moved > 0:
+            self.lat, self.lon = _destination(self.lat, self.lon, self.heading, distance_moved)
+
+    def _tick_landing(self, dt: float, nav_system):
+        self.altitude -= self.descent_speed * dt
+        if self.altitude <= 0.1:
+            self.altitude = 0
+            self.state = DroneState.LANDED
+            self.velocity = 0
+            print("DRONE HAS LANDED SUCCESSFULLY!")
             
     def get_battery_status(self):
         """Return the current battery level and status."""
@@ -216,6 +320,59 @@ class Drone:
         else:
             return self.battery, "CRITICAL"
             
+    # --- Fleet-backed physical state ---
+    # Scalar access goes through the drone's row of the fleet's record array,
+    # so single-drone code keeps its attribute syntax while batch code can
+    # operate on the whole columns.
+
+    @property
+    def lat(self):
+        return float(self._row['lat'])
+
+    @lat.setter
+    def lat(self, value):
+        self._row['lat'] = value
+
+    @property
+    def lon(self):
+        return float(self._row['lon'])
+
+    @lon.setter
+    def lon(self, value):
+        self._row['lon'] = value
+
+    @property
+    def z(self):
+        return float(self._row['z'])
+
+    @z.setter
+    def z(self, value):
+        self._row['z'] = value
+
+    @property
+    def heading(self):
+        return float(self._row['heading'])
+
+    @heading.setter
+    def heading(self, value):
+        self._row['heading'] = value
+
+    @property
+    def velocity(self):
+        return float(self._row['vel'])
+
+    @velocity.setter
+    def velocity(self, value):
+        self._row['vel'] = value
+
+    @property
+    def battery(self):
+        return float(self._row['battery'])
+
+    @battery.setter
+    def battery(self, value):
+        self._row['battery'] = value
+
     @property
     def altitude(self):
         return self.z
@@ -274,10 +431,7 @@ class Drone:
         
         # Draw heading indicator (0=N, 90=E, 180=S, 270=W)
         # Pygame's y-axis is inverted, and 0 degrees is to the right.
-        # We need to convert from bearing (0=N) to pygame angle (0=E).
-        # Angle in Pygame = -Bearing + 90
-        pygame_angle_rad = math.radians(-self.heading + 90)
-        
-        line_end_x = center_x + 12 * math.cos(pygame_angle_rad)
-        line_end_y = center_y - 12 * math.sin(pygame_angle_rad)
-        pygame.draw.line(surface, (255, 0, 0), (center_x, center_y), (int(line_end_x), int(line_end_y)), 3)
+        # The bearing (0=N) to pygame angle (0=E) conversion is baked into
+        # the precomputed lookup table.
+        dx, dy = Drone._heading_lut[int(self.heading) % 360]
+        pygame.draw.line(surface, (255, 0, 0), (center_x, center_y), (center_x + int(dx), center_y + int(dy)), 3)
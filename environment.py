@@ -4,6 +4,7 @@ import pygame
 import math
 import os
 import json
+import numpy as np
 from typing import Tuple, List
 from geo_utils import deg2num, num2deg, get_parent_tile
 
@@ -18,6 +19,41 @@ class Environment:
         self.map_surface = ground_truth_map # Use the pre-rendered satellite map
         self.map_rect = self.map_surface.get_rect()
 
+        # Precompute the affine lat/lon <-> pixel coefficients once: the bbox
+        # and map size are fixed after construction, so the per-call range
+        # subtractions and divisions can be folded into two multipliers.
+        min_lon, min_lat, max_lon, max_lat = self.map_meta['bbox']
+        map_width, map_height = self.map_surface.get_size()
+        self._min_lon = min_lon
+        self._max_lat = max_lat
+        lon_range = max_lon - min_lon
+        lat_range = max_lat - min_lat
+        if lon_range == 0 or lat_range == 0 or map_width == 0 or map_height == 0:
+            # Degenerate bbox or map; the conversion methods fall back.
+            self._x_scale = self._y_scale = None
+            self._lon_per_px = self._lat_per_px = None
+        else:
+            self._x_scale = map_width / lon_range
+            self._y_scale = map_height / lat_range
+            self._lon_per_px = lon_range / map_width
+            self._lat_per_px = lat_range / map_height
+
+        # Cache of scaled camera views for the altitude-dependent zoom phases,
+        # keyed by (altitude bucket, crop center, camera size). See get_camera_view.
+        self._camera_view_cache = {}
+        self._camera_view_cache_max = 32
+
+        # Vignette overlay template, built lazily per camera size. Drawn once
+        # at full opacity; per-frame intensity is applied with set_alpha.
+        self._vignette = None
+        self._vignette_size = None
+
+        # Last fully composed camera view, keyed by quantized drone pose.
+        # While the drone hovers, successive frames hit this and skip all
+        # image work. See get_camera_view.
+        self._view_cache_key = None
+        self._view_cache_surface = None
+
     def _load_map_meta(self):
         try:
             with open('map_meta.json', 'r') as f:
@@ -35,7 +71,14 @@ class Environment:
         The view is scaled based on the drone's altitude.
         """
         cam_width, cam_height = camera_size
-        
+
+        # While HOVERING (and through much of SEARCHING) the drone's pose is
+        # effectively unchanged between frames; quantize it and return the
+        # previous frame's composed view on a hit.
+        view_key = (round(drone_lat, 6), round(drone_lon, 6), round(altitude, 1), camera_size)
+        if view_key == self._view_cache_key:
+            return self._view_cache_surface
+
         # Determine the crop area on the full map based on drone's lat/lon
         center_x, center_y = self.latlon_to_screen(drone_lat, drone_lon)
 
@@ -49,70 +92,122 @@ class Environment:
         max_zoom_factor = 10.0 # At altitude 0, the view is 10x zoomed in.
 
         if altitude >= cruise_altitude:
-            # At or above cruise altitude, maintain a standard view.
-            scale_factor = 1.0
+            # At or above cruise altitude the crop already matches the camera
+            # size, so the scale is effectively a copy. Plain (nearest)
+            # scale is several times cheaper than smoothscale's bilinear
+            # filter and visually identical here.
+            crop_rect = pygame.Rect(
+                center_x - cam_width / 2,
+                center_y - cam_height / 2,
+                cam_width,
+                cam_height
+            )
+            clipped_rect = crop_rect.clip(self.map_rect)
+            camera_view = pygame.transform.scale(self.map_surface.subsurface(clipped_rect), camera_size)
         else:
-            # From ground to cruise altitude, interpolate the zoom factor.
-            # As altitude increases, zoom factor decreases from max_zoom_factor to 1.0.
-            zoom_progress = altitude / cruise_altitude
-            scale_factor = max_zoom_factor - (zoom_progress * (max_zoom_factor - 1.0))
-        
-        # A larger scale_factor means a smaller crop area (zoom in).
-        crop_width = cam_width / scale_factor
-        crop_height = cam_height / scale_factor
-
-        # Define the source rectangle for the crop
-        crop_rect = pygame.Rect(
-            center_x - crop_width / 2,
-            center_y - crop_height / 2,
-            crop_width,
-            crop_height
-        )
-
-        # Clip the crop_rect to ensure it's entirely within the map's boundaries.
-        # .clip() will adjust both position and size to fit.
-        clipped_rect = crop_rect.clip(self.map_rect)
-
-        # Create a subsurface from the main map using the safe, clipped rectangle.
-        # Using a subsurface is efficient as it doesn't copy pixel data.
-        cropped_surface = self.map_surface.subsurface(clipped_rect)
-
-        # Scale the cropped view to fit the camera panel
-        camera_view = pygame.transform.smoothscale(cropped_surface, camera_size)
-        
+            # During takeoff and landing the zoom follows altitude. Quantize
+            # the altitude to 5m buckets so consecutive frames at nearly the
+            # same height reuse one scaled surface instead of re-filtering
+            # the crop every frame.
+            alt_bucket = int(altitude // 5)
+            cache_key = (alt_bucket, center_x, center_y, camera_size)
+            camera_view = self._camera_view_cache.get(cache_key)
+            if camera_view is None:
+                # From ground to cruise altitude, interpolate the zoom factor.
+                # As altitude increases, zoom factor decreases from max_zoom_factor to 1.0.
+                zoom_progress = (alt_bucket * 5) / cruise_altitude
+                scale_factor = max_zoom_factor - (zoom_progress * (max_zoom_factor - 1.0))
+
+                # A larger scale_factor means a smaller crop area (zoom in).
+                crop_width = cam_width / scale_factor
+                crop_height = cam_height / scale_factor
+
+                # Define the source rectangle for the crop
+                crop_rect = pygame.Rect(
+                    center_x - crop_width / 2,
+                    center_y - crop_height / 2,
+                    crop_width,
+                    crop_height
+                )
+
+                # Clip the crop_rect to ensure it's entirely within the map's boundaries.
+                # .clip() will adjust both position and size to fit.
+                clipped_rect = crop_rect.clip(self.map_rect)
+
+                # Create a subsurface from the main map using the safe, clipped rectangle.
+                # Using a subsurface is efficient as it doesn't copy pixel data.
+                cropped_surface = self.map_surface.subsurface(clipped_rect)
+
+                # Scale the cropped view to fit the camera panel
+                camera_view = pygame.transform.smoothscale(cropped_surface, camera_size)
+
+                if len(self._camera_view_cache) >= self._camera_view_cache_max:
+                    # Evict the oldest entry; insertion order doubles as age.
+                    self._camera_view_cache.pop(next(iter(self._camera_view_cache)))
+                self._camera_view_cache[cache_key] = camera_view
+
         # Add vignette effect at low altitude
         if altitude < 60:
+            # Composite onto a copy so cached surfaces stay vignette-free.
+            camera_view = camera_view.copy()
             vignette_alpha = int(150 * (1 - (altitude / 60)))
-            vignette = pygame.Surface(camera_size, pygame.SRCALPHA)
-            pygame.draw.rect(vignette, (0,0,0,vignette_alpha), vignette.get_rect())
-            center_ellipse_rect = vignette.get_rect().inflate(-vignette.get_width()*0.2, -vignette.get_height()*0.2)
-            pygame.draw.ellipse(vignette, (0,0,0,0), center_ellipse_rect)
+            vignette = self._get_vignette(camera_size)
+            vignette.set_alpha(vignette_alpha)
             camera_view.blit(vignette,(0,0))
 
+        self._view_cache_key = view_key
+        self._view_cache_surface = camera_view
         return camera_view
 
+    def _get_vignette(self, camera_size: Tuple[int, int]) -> pygame.Surface:
+        """
+        Return the vignette overlay template for the given camera size,
+        rendering it only once. The template is drawn at full opacity; the
+        caller scales the overall intensity with set_alpha, which multiplies
+        into the per-pixel alpha at blit time.
+        """
+        if self._vignette is None or self._vignette_size != camera_size:
+            w, h = camera_size
+            vignette = pygame.Surface(camera_size, pygame.SRCALPHA)
+            vignette.fill((0, 0, 0, 0))
+
+            # Radial alpha falloff computed as one vectorized numpy pass:
+            # fully clear inside 80% of the half-extent, ramping to fully
+            # opaque at the frame edge. This replaces the old hard-edged
+            # rect-with-ellipse-hole composite with a smooth gradient.
+            y, x = np.ogrid[:h, :w]
+            dist = np.hypot(x - w / 2, y - h / 2)
+            alpha = np.clip(255 * (dist / (0.5 * min(w, h)) - 0.8) / 0.2, 0, 255).astype(np.uint8)
+            pygame.surfarray.pixels_alpha(vignette)[:] = alpha.T
+
+            self._vignette = vignette
+            self._vignette_size = camera_size
+        return self._vignette
+
     def latlon_to_screen(self, lat: float, lon: float) -> Tuple[int, int]:
         """
         Convert latitude and longitude to screen coordinates on the ground truth map.
         """
-        # Bounding box of the map in lat/lon
-        min_lon, min_lat, max_lon, max_lat = self.map_meta['bbox']
-
-        # Map dimensions in pixels
-        map_width, map_height = self.map_surface.get_size()
+        # Handle a degenerate (point) bbox
+        if self._x_scale is None:
+            return self.map_rect.width // 2, self.map_rect.height // 2
 
-        # Handle potential division by zero if bbox is a point
-        lon_range = max_lon - min_lon
-        lat_range = max_lat - min_lat
-        if lon_range == 0 or lat_range == 0:
-            return map_width // 2, map_height // 2
+        # Simple linear interpolation via the precomputed multipliers.
+        # For latitude, the mapping is inverted (higher lat is lower y).
+        return (int((lon - self._min_lon) * self._x_scale),
+                int((self._max_lat - lat) * self._y_scale))
 
-        # Simple linear interpolation
-        screen_x = ((lon - min_lon) / lon_range) * map_width
-        # For latitude, the mapping is inverted (higher lat is lower y)
-        screen_y = ((max_lat - lat) / lat_range) * map_height
+    def latlon_to_screen_vec(self, lats, lons):
+        """
+        Vectorized latlon_to_screen: project arrays of coordinates onto the
+        map in one numpy pass. Returns a pair of float arrays (xs, ys).
+        """
+        if self._x_scale is None:
+            return (np.full_like(lons, self.map_rect.width // 2, dtype=np.float64),
+                    np.full_like(lats, self.map_rect.height // 2, dtype=np.float64))
 
-        return int(screen_x), int(screen_y)
+        return ((lons - self._min_lon) * self._x_scale,
+                (self._max_lat - lats) * self._y_scale)
 
     def get_map_surface(self):
         return self.map_surface
@@ -121,20 +216,11 @@ class Environment:
         """
         Convert screen coordinates on the ground truth map to latitude and longitude.
         """
-        min_lon, min_lat, max_lon, max_lat = self.map_meta['bbox']
-        map_width, map_height = self.map_surface.get_size()
-
-        lon_range = max_lon - min_lon
-        lat_range = max_lat - min_lat
-
-        if map_width == 0 or map_height == 0:
+        if self._lon_per_px is None:
             return 0.0, 0.0
 
         # Inverse of the linear interpolation in latlon_to_screen
-        lon_percent = screen_x / map_width
-        lat_percent = screen_y / map_height
-
-        lon = min_lon + (lon_percent * lon_range)
-        lat = max_lat - (lat_percent * lat_range) # Inverted mapping for latitude
+        lon = self._min_lon + (screen_x * self._lon_per_px)
+        lat = self._max_lat - (screen_y * self._lat_per_px) # Inverted mapping for latitude
 
         return lat, lon
\ No newline at end of file
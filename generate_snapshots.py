@@ -1,21 +1,98 @@
 import json
 import os
+import struct
 import requests
 import cv2
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from geopy.distance import distance as geopy_distance
 from geopy.point import Point
 
-def generate_snapshots():
-    """Loads route from route.json and fetches satellite snapshots for each waypoint."""
+IMAGERY_URL = "https://services.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/export"
+
+MAX_DOWNLOAD_WORKERS = 8
+
+# One session shared across all download threads (and by app.py for the
+# ground-truth map): connections to the ArcGIS host are kept alive between
+# requests instead of paying a TLS handshake per fetch, with a pool sized to
+# the worker count and automatic retries on transient gateway errors.
+# requests.Session is thread-safe for GET.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=MAX_DOWNLOAD_WORKERS,
+    pool_maxsize=MAX_DOWNLOAD_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+))
+
+def _fetch_to_file(params, path):
+    """Fetch one ArcGIS export and stream it straight to disk in sized chunks
+    rather than buffering the whole PNG in memory."""
+    response = SESSION.get(IMAGERY_URL, params=params, timeout=30, stream=True)
+    response.raise_for_status()
+    try:
+        with open(path, 'wb') as f:
+            # iter_content (unlike reading response.raw) wraps mid-body
+            # transport errors in requests exceptions, so a dropped
+            # connection stays catchable as a RequestException upstream
+            for chunk in response.iter_content(65536):
+                f.write(chunk)
+    except Exception:
+        # A download cut off mid-body still has a valid PNG header; remove
+        # the partial file so it can't pass the header-only validation.
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+
+def _fetch_snapshot(job):
+    """Fetch the satellite image for a single waypoint.
+    Returns (index, name, snapshot_path)."""
+    i, wp, snapshot_path = job
+    lat, lon, name = wp['lat'], wp['lon'], wp['name']
+    print(f"Fetching satellite image for waypoint {i}: {name}")
+
+    center_point = Point(latitude=lat, longitude=lon)
+    dist_m = 50
+    north = geopy_distance(meters=dist_m).destination(center_point, 0)
+    east = geopy_distance(meters=dist_m).destination(center_point, 90)
+    south = geopy_distance(meters=dist_m).destination(center_point, 180)
+    west = geopy_distance(meters=dist_m).destination(center_point, 270)
+
+    bbox = f"{west.longitude},{south.latitude},{east.longitude},{north.latitude}"
+
+    params = {
+        'bbox': bbox,
+        'bboxSR': 4326,
+        'size': '500,500',
+        'imageSR': 4326,
+        'format': 'png',
+        'transparent': 'false',
+        'f': 'image'
+    }
+
+    _fetch_to_file(params, snapshot_path)
+    return (i, name, snapshot_path)
+
+def generate_snapshots(waypoints=None, extra_jobs=None):
+    """Fetches satellite snapshots for each waypoint of the route.
+
+    The route can be passed in directly by a caller that already holds it
+    (app.py does); otherwise it is loaded from route.json. extra_jobs is an
+    optional list of (params, path) ArcGIS fetches (e.g. the ground-truth
+    map) to run through the same thread pool and session as the snapshots,
+    so one batched round of concurrent requests covers everything.
+    """
     print("--- Generating Waypoint Snapshots ---")
 
-    try:
-        with open('route.json', 'r') as f:
-            waypoints = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error: Could not load or parse route.json: {e}")
-        return
+    if waypoints is None:
+        try:
+            with open('route.json', 'r') as f:
+                waypoints = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error: Could not load or parse route.json: {e}")
+            return
 
     if not waypoints or len(waypoints) < 2:
         print("Warning: Route requires at least two points (a start and a destination). No snapshots to generate.")
@@ -30,60 +107,59 @@ def generate_snapshots():
             os.remove(os.path.join(satellite_snapshot_dir, f))
         print(f"Cleared existing snapshots in {satellite_snapshot_dir}")
 
-        IMAGERY_URL = "https://services.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/export"
-
         print(f"\nINFO: The first waypoint is the drone's start position and does not require a snapshot.")
         print(f"      Generating snapshots for the remaining {len(waypoints) - 1} destination waypoints...")
 
+        # Downloads are network-bound, so dispatch all waypoint requests
+        # concurrently and validate each image as its result arrives.
+        jobs = []
         for i, wp in enumerate(waypoints[1:], start=1):
-            lat, lon, name = wp['lat'], wp['lon'], wp['name']
-            print(f"Fetching satellite image for waypoint {i}: {name}")
-
-            center_point = Point(latitude=lat, longitude=lon)
-            dist_m = 50
-            north = geopy_distance(meters=dist_m).destination(center_point, 0)
-            east = geopy_distance(meters=dist_m).destination(center_point, 90)
-            south = geopy_distance(meters=dist_m).destination(center_point, 180)
-            west = geopy_distance(meters=dist_m).destination(center_point, 270)
-            
-            bbox = f"{west.longitude},{south.latitude},{east.longitude},{north.latitude}"
-
-            params = {
-                'bbox': bbox,
-                'bboxSR': 4326,
-                'size': '500,500',
-                'imageSR': 4326,
-                'format': 'png',
-                'transparent': 'false',
-                'f': 'image'
-            }
-
-            response = requests.get(IMAGERY_URL, params=params)
-            response.raise_for_status()
-
-            # --- Image Validation ---
-            try:
-                image_array = np.frombuffer(response.content, np.uint8)
-                img = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-                
-                if img is None:
-                    raise ValueError("OpenCV could not decode the image. It might be invalid or corrupted.")
-                
-                h, w, _ = img.shape
-                if h < 100 or w < 100:
-                    raise ValueError(f"Image is too small ({w}x{h}). It might be an error image from the API.")
-
-            except Exception as e:
-                print(f" !! Validation failed for waypoint {i} ({name}): {e}")
-                print(f" !! The downloaded content might be an error message instead of a map image.")
-                print(f" !! Skipping this snapshot.")
-                continue
-            # --- End Validation ---
-
-            snapshot_filename = os.path.join(satellite_snapshot_dir, f"waypoint_{i-1}_{name.replace(' ', '_')}.png")
-            with open(snapshot_filename, 'wb') as f:
-                f.write(response.content)
-            print(f" -> Saved satellite snapshot to {snapshot_filename}")
+            snapshot_filename = f"waypoint_{i-1}_{wp['name'].replace(' ', '_')}.png"
+            jobs.append((i, wp, os.path.join(satellite_snapshot_dir, snapshot_filename)))
+
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+            extra_futures = [executor.submit(_fetch_to_file, params, path)
+                             for params, path in (extra_jobs or [])]
+
+            for i, name, snapshot_path in executor.map(_fetch_snapshot, jobs):
+                # --- Image Validation ---
+                # A PNG stores its dimensions in the IHDR chunk directly after
+                # the 8-byte signature, so reading 24 bytes is enough to
+                # validate the download without decoding the whole image.
+                try:
+                    with open(snapshot_path, 'rb') as img_f:
+                        header = img_f.read(24)
+
+                    if len(header) == 24 and header[:8] == b'\x89PNG\r\n\x1a\n':
+                        w, h = struct.unpack('>II', header[16:24])
+                    else:
+                        # Unexpected header; fall back to a quarter-resolution
+                        # decode (~16x less work than a full one), which is
+                        # still enough to detect an API error payload.
+                        img = cv2.imread(snapshot_path, cv2.IMREAD_REDUCED_COLOR_4)
+
+                        if img is None:
+                            raise ValueError("OpenCV could not decode the image. It might be invalid or corrupted.")
+
+                        h, w, _ = img.shape
+                        h, w = h * 4, w * 4  # back to full-image dimensions
+
+                    if h < 100 or w < 100:
+                        raise ValueError(f"Image is too small ({w}x{h}). It might be an error image from the API.")
+
+                except Exception as e:
+                    print(f" !! Validation failed for waypoint {i} ({name}): {e}")
+                    print(f" !! The downloaded content might be an error message instead of a map image.")
+                    print(f" !! Skipping this snapshot.")
+                    os.remove(snapshot_path)
+                    continue
+                # --- End Validation ---
+
+                print(f" -> Saved satellite snapshot to {snapshot_path}")
+
+            # Surface any failure from the batched extra fetches
+            for future in extra_futures:
+                future.result()
 
         num_generated = len(os.listdir(satellite_snapshot_dir))
         print(f"\n--- Snapshot generation complete! ---")
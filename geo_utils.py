@@ -1,8 +1,14 @@
 # geo_utils.py - Geographic utility functions
 
 import math
+from functools import lru_cache
 from typing import Tuple
 
+# These are pure functions over small immutable arguments, and callers tend
+# to ask about the same tile for many consecutive frames, so a modest LRU
+# cache turns the repeat trig work into dict lookups.
+
+@lru_cache(maxsize=4096)
 def deg2num(lat_deg: float, lon_deg: float, zoom: int) -> Tuple[int, int]:
     """Convert lat/lon to tile numbers"""
     lat_rad = math.radians(lat_deg)
@@ -11,6 +17,7 @@ def deg2num(lat_deg: float, lon_deg: float, zoom: int) -> Tuple[int, int]:
     ytile = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
     return (xtile, ytile)
 
+@lru_cache(maxsize=4096)
 def num2deg(xtile: int, ytile: int, zoom: int) -> Tuple[float, float]:
     """Convert tile numbers to lat/lon of the top-left corner"""
     n = 2.0 ** zoom
@@ -19,6 +26,7 @@ def num2deg(xtile: int, ytile: int, zoom: int) -> Tuple[float, float]:
     lat_deg = math.degrees(lat_rad)
     return (lat_deg, lon_deg)
 
+@lru_cache(maxsize=4096)
 def get_parent_tile(x: int, y: int, zoom: int) -> Tuple[int, int, int, Tuple[int, int]]:
     """
     Calculates the parent tile coordinates and the quadrant of the child.
@@ -1,3 +1,4 @@
+import functools
 import pygame
 import sys
 import json
@@ -5,8 +6,10 @@ from environment import Environment
 from drone import Drone, DroneState
 from navigation import NavigationSystem
 from vision_system import VisionSystem
+import glob
 import os
 import cv2
+import numpy as np
 
 # --- Constants ---
 SCREEN_WIDTH, SCREEN_HEIGHT = 1600, 900
@@ -44,16 +47,31 @@ pygame.init()
 pygame.font.init()
 
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Drone Simulation")
+pygame.display.set_caption("Drone Simulation - Visual Navigation")
 
 font_small = pygame.font.SysFont('Arial', 16)
 font_large = pygame.font.SysFont('Arial', 22, bold=True)
 
+# Static labels never change, so rasterize them once instead of calling
+# font.render on the same strings every frame.
+LABEL_NAVIGATION = font_large.render("NAVIGATION", True, (255, 255, 255))
+LABEL_TARGET_WAYPOINT = font_small.render("Target Waypoint", True, (255, 255, 255))
+LABEL_LIVE_DRONE_VIEW = font_small.render("Live Drone View", True, (255, 255, 255))
+
+@functools.lru_cache(maxsize=128)
+def render_text(font_id, text, color):
+    """
+    Memoized font.render for the dynamically formatted status strings.
+    Most of them (altitude, heading, confidence) repeat for many frames in
+    a row, so the rasterization only happens when the text actually changes.
+    """
+    font = font_large if font_id == 'large' else font_small
+    return font.render(text, True, color)
+
 # --- Load Route and Environment ---
 print("Loading route and environment...")
-with open('route.json', 'r') as f:
-    waypoints = json.load(f)
-    start_pos = (waypoints[0]['lat'], waypoints[0]['lon'])
+waypoints = WAYPOINTS  # Already loaded and validated above
+start_pos = (waypoints[0]['lat'], waypoints[0]['lon'])
 
 # Load the new satellite ground truth map
 ground_truth_map_path = os.path.join("assets", "drone_feed.png")
@@ -66,54 +84,98 @@ else:
     ground_truth_map = pygame.Surface((1500, 1000))
     ground_truth_map.fill((0, 0, 0))
 
-# Load satellite waypoint snapshots for the vision system
+# Load satellite waypoint snapshots once each: decode the PNG with cv2 for
+# the vision system, then wrap the same pixels into a pygame surface for the
+# UI instead of re-reading and re-decoding the file with pygame.image.load.
 satellite_snapshot_dir = os.path.join("assets", "waypoint_snapshots")
 satellite_snapshots = []
-if os.path.exists(satellite_snapshot_dir):
-    snapshot_files = sorted(os.listdir(satellite_snapshot_dir))
-    for filename in snapshot_files:
-        if filename.endswith(".png"):
-            try:
-                img = cv2.imread(os.path.join(satellite_snapshot_dir, filename))
-                satellite_snapshots.append(img)
-            except Exception as e:
-                print(f"Could not load satellite snapshot {filename}: {e}")
+satellite_snapshot_paths = []
+ui_satellite_snapshots = []
+for img_path in sorted(glob.glob(os.path.join(satellite_snapshot_dir, "*.png"))):
+    try:
+        img = cv2.imread(img_path)
+        satellite_snapshots.append(img)
+        satellite_snapshot_paths.append(img_path)
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        ui_img = pygame.image.frombuffer(
+            rgb.tobytes(), (rgb.shape[1], rgb.shape[0]), 'RGB').convert()
+        ui_satellite_snapshots.append(ui_img)
+    except Exception as e:
+        print(f"Could not load satellite snapshot {os.path.basename(img_path)}: {e}")
 print(f"Loaded {len(satellite_snapshots)} satellite waypoint snapshots for CV.")
 
-# Also load snapshots as Pygame surfaces for UI display
-ui_satellite_snapshots = []
-if os.path.exists(satellite_snapshot_dir):
-    snapshot_files = sorted(os.listdir(satellite_snapshot_dir))
-    for filename in snapshot_files:
-        if filename.endswith(".png"):
-            try:
-                img_path = os.path.join(satellite_snapshot_dir, filename)
-                ui_img = pygame.image.load(img_path).convert()
-                ui_satellite_snapshots.append(ui_img)
-            except Exception as e:
-                print(f"Could not load UI snapshot {filename}: {e}")
+# The waypoint-panel thumbnails have a fixed size, so scale the UI snapshots
+# once here instead of smoothscaling the current target every frame
+half_panel_width = INFO_PANEL_WIDTH // 2
+img_size = (half_panel_width - 15, WAYPOINT_VIEW_HEIGHT - 40)
+ui_satellite_snapshots_scaled = [pygame.transform.smoothscale(img, img_size)
+                                 for img in ui_satellite_snapshots]
+
+# SoA copies of the route coordinates so the render loop can project every
+# waypoint in one vectorized call instead of a Python loop over dicts
+wp_lats = np.array([wp['lat'] for wp in waypoints], dtype=np.float64)
+wp_lons = np.array([wp['lon'] for wp in waypoints], dtype=np.float64)
 
 env = Environment(waypoints, ground_truth_map)
 map_surface = env.get_map_surface() # This now just returns the loaded map
 map_rect = map_surface.get_rect()
 
-screen_width, screen_height = 1600, 900 # Increased width for new panels
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption("Drone Simulation - Visual Navigation")
-
-font_small = pygame.font.SysFont("Arial", 16)
-font_large = pygame.font.SysFont("Arial", 22, bold=True)
+# The route never changes during a run, so project it once: map-space
+# coordinates for the main view (shifted by the viewport each frame) and
+# ready-to-draw pixel positions for the overview panel.
+route_world_xs, route_world_ys = env.latlon_to_screen_vec(wp_lats, wp_lons)
+route_world_points = np.stack((route_world_xs, route_world_ys), axis=1).astype(np.int32)
+overview_route_points = np.stack((
+    ((route_world_xs / map_rect.width) * INFO_PANEL_WIDTH).astype(np.int32) + DRONE_VIEW_WIDTH,
+    ((route_world_ys / map_rect.height) * ROUTE_OVERVIEW_HEIGHT).astype(np.int32),
+), axis=1)
 
 # Load and resize the drone icon before the main loop
 drone_icon = pygame.image.load('drone.png').convert_alpha() # Use convert_alpha for transparency
 drone_icon = pygame.transform.scale(drone_icon, (50, 50)) # Resize to a suitable size
 
+# Pre-rotate the icon for every integer-degree heading and pre-extract the
+# centered blit positions: a few MB of surfaces in exchange for no software
+# rotation in the render loop.
+rotated_drone_icons = [pygame.transform.rotate(drone_icon, -a) for a in range(360)]
+rotated_drone_topleft = [icon.get_rect(center=(DRONE_VIEW_WIDTH / 2, SCREEN_HEIGHT / 2)).topleft
+                         for icon in rotated_drone_icons]
+
 clock = pygame.time.Clock()
 
+# Offscreen surface for the drone-centered main view. Rendering here first
+# lets the vision system crop it with a zero-copy subsurface instead of
+# copying a region back out of the framebuffer every frame.
+view_surface = pygame.Surface((DRONE_VIEW_WIDTH, SCREEN_HEIGHT))
+
+# The camera crop is a live window onto view_surface (subsurfaces share
+# pixels), so it can be created once here and stays current as the view is
+# redrawn each frame.
+snapshot_size = 500
+crop_rect = pygame.Rect(0, 0, snapshot_size, snapshot_size)
+crop_rect.center = (DRONE_VIEW_WIDTH // 2, SCREEN_HEIGHT // 2)
+live_drone_view_surface = view_surface.subsurface(crop_rect)
+
+# The main-view route only changes when a waypoint is reached (the circles
+# flip color), so it is drawn in map coordinates onto this transparent
+# overlay once per waypoint advance; each frame just blits the viewport's
+# slice of it instead of re-running the per-segment draw calls.
+route_overlay = pygame.Surface(map_rect.size, pygame.SRCALPHA)
+route_overlay_wp_idx = None
+
+def rebuild_route_overlay(current_idx):
+    route_overlay.fill((0, 0, 0, 0))
+    if len(route_world_points) > 1:
+        pygame.draw.lines(route_overlay, (255, 255, 0), False, route_world_points, 3)
+    for i, point in enumerate(route_world_points):
+        wp_color = (0, 255, 0) if i < current_idx else (255, 0, 0)
+        pygame.draw.circle(route_overlay, wp_color, point, 8)
+        pygame.draw.circle(route_overlay, (255, 255, 255), point, 8, 1)
+
 # --- Objects ---
 drone = Drone(start_pos_lat_lon=start_pos, start_alt=10.0)
 nav_system = NavigationSystem(waypoints)
-vision_system = VisionSystem(satellite_snapshots)
+vision_system = VisionSystem(satellite_snapshots, satellite_snapshot_paths)
 
 # Create scaled-down version of the overview map
 route_overview_map = pygame.transform.smoothscale(ground_truth_map, (INFO_PANEL_WIDTH, ROUTE_OVERVIEW_HEIGHT))
@@ -124,41 +186,41 @@ def draw_status_text(screen, font_small, font_large, drone, nav_system, panel_po
 
     # Drone State
     state_text = f"{drone.state.name}"
-    state_surface = font_large.render(state_text, True, (255, 255, 0))
+    state_surface = render_text('large', state_text, (255, 255, 0))
     screen.blit(state_surface, (x_offset, y_offset))
     y_offset += 40
 
     # Position and Altitude
     lat, lon, alt = drone.lat, drone.lon, drone.altitude
     pos_text = f"Lat: {lat:.5f}, Lon: {lon:.5f}"
-    screen.blit(font_small.render(pos_text, True, (255, 255, 255)), (x_offset, y_offset))
+    screen.blit(render_text('small', pos_text, (255, 255, 255)), (x_offset, y_offset))
     y_offset += line_height
-    screen.blit(font_small.render(f"Altitude: {alt:.1f} m", True, (255, 255, 255)), (x_offset, y_offset))
+    screen.blit(render_text('small', f"Altitude: {alt:.1f} m", (255, 255, 255)), (x_offset, y_offset))
     y_offset += line_height
-    screen.blit(font_small.render(f"Heading: {drone.heading:.1f}", True, (255, 255, 255)), (x_offset, y_offset))
+    screen.blit(render_text('small', f"Heading: {drone.heading:.1f}", (255, 255, 255)), (x_offset, y_offset))
     y_offset += line_height
 
     # Navigation Info
     dist_to_wp = nav_system.distance_to_wp
     if dist_to_wp is not None:
         dist_text = f"Dist to WP: {dist_to_wp:.1f} m"
-        screen.blit(font_small.render(dist_text, True, (255, 255, 255)), (x_offset, y_offset))
+        screen.blit(render_text('small', dist_text, (255, 255, 255)), (x_offset, y_offset))
         y_offset += line_height
 
     # Match Confidence
     confidence_text = f"Match Confidence: {last_match_confidence:.2f}"
-    screen.blit(font_small.render(confidence_text, True, (255, 255, 255)), (x_offset, y_offset))
+    screen.blit(render_text('small', confidence_text, (255, 255, 255)), (x_offset, y_offset))
     y_offset += line_height
 
     # Navigation
     y_offset += 10
-    screen.blit(font_large.render("NAVIGATION", True, (255, 255, 255)), (x_offset, y_offset))
+    screen.blit(LABEL_NAVIGATION, (x_offset, y_offset))
     y_offset += 30
-    screen.blit(font_small.render(f"Next Waypoint: {nav_system.get_current_waypoint_index()}", True, (255, 255, 255)), (x_offset, y_offset))
+    screen.blit(render_text('small', f"Next Waypoint: {nav_system.get_current_waypoint_index()}", (255, 255, 255)), (x_offset, y_offset))
     if nav_system.distance_to_wp is not None and nav_system.bearing_to_wp is not None:
-        screen.blit(font_small.render(f"Distance: {nav_system.distance_to_wp:.1f} m | Bearing: {nav_system.bearing_to_wp:.1f}", True, (255, 255, 255)), (x_offset, y_offset + line_height))
+        screen.blit(render_text('small', f"Distance: {nav_system.distance_to_wp:.1f} m | Bearing: {nav_system.bearing_to_wp:.1f}", (255, 255, 255)), (x_offset, y_offset + line_height))
 
-def draw_route_on_overview(screen, env, nav_system, waypoints, drone, panel_x_offset, map_rect):
+def draw_route_on_overview(screen, env, nav_system, drone, panel_x_offset, map_rect):
     # Draw route line and waypoints on overview
     if drone.state == DroneState.RETURN_HOME:
         home_pos = drone.start_pos_lat_lon
@@ -172,12 +234,7 @@ def draw_route_on_overview(screen, env, nav_system, waypoints, drone, panel_x_of
 
         pygame.draw.line(screen, (0, 255, 255), (drone_overview_x, drone_overview_y), (overview_home_x, overview_home_y), 3)
     else:
-        route_points = []
-        for wp in waypoints:
-            wp_x, wp_y = env.latlon_to_screen(wp['lat'], wp['lon'])
-            overview_x = int((wp_x / map_rect.width) * INFO_PANEL_WIDTH) + panel_x_offset
-            overview_y = int((wp_y / map_rect.height) * ROUTE_OVERVIEW_HEIGHT)
-            route_points.append((overview_x, overview_y))
+        route_points = overview_route_points
 
         if len(route_points) > 1:
             pygame.draw.lines(screen, (255, 255, 0), False, route_points, 2)
@@ -200,6 +257,13 @@ last_match_confidence = 0.0
 last_search_match_time = 0
 SEARCH_MATCH_INTERVAL = 0.5  # seconds
 
+# The live-view thumbnail reads fine at ~6 Hz; rescaling the 500x500 crop
+# at the full 30 Hz frame rate is wasted work, so refresh every 5th frame
+# and reuse the cached scaled surface in between.
+LIVE_VIEW_REFRESH_FRAMES = 5
+frame_count = 0
+scaled_live_view = None
+
 # --- Main Loop ---
 running = True
 while running:
@@ -216,44 +280,36 @@ while running:
     # --- Drawing --- #
     screen.fill((20, 20, 30)) # Dark blue-grey background
 
-    # 1. Main View: Top-down map centered on the drone
+    # 1. Main View: Top-down map centered on the drone, rendered offscreen
     # Calculate the top-left corner of the map section to blit
     drone_map_x, drone_map_y = env.latlon_to_screen(drone.lat, drone.lon)
     view_x = drone_map_x - DRONE_VIEW_WIDTH / 2
     view_y = drone_map_y - SCREEN_HEIGHT / 2
 
     # Blit the relevant part of the full map
-    screen.blit(map_surface, (0, 0), (view_x, view_y, DRONE_VIEW_WIDTH, SCREEN_HEIGHT))
+    view_surface.blit(map_surface, (0, 0), (view_x, view_y, DRONE_VIEW_WIDTH, SCREEN_HEIGHT))
 
-    # Draw the route on the main view, relative to the drone's position
+    # Draw the route on the main view by blitting the viewport's slice of
+    # the cached overlay, rebuilding it only when the waypoint state changes
     if drone.state != DroneState.RETURN_HOME:
-        route_points = []
-        for wp in waypoints:
-            wp_x, wp_y = env.latlon_to_screen(wp['lat'], wp['lon'])
-            view_wp_x = wp_x - view_x
-            view_wp_y = wp_y - view_y
-            route_points.append((view_wp_x, view_wp_y))
-
-        if len(route_points) > 1:
-            pygame.draw.lines(screen, (255, 255, 0), False, route_points, 3)
-
-        for i, point in enumerate(route_points):
-            wp_color = (0, 255, 0) if i < nav_system.get_current_waypoint_index() else (255, 0, 0)
-            pygame.draw.circle(screen, wp_color, point, 8)
-            pygame.draw.circle(screen, (255, 255, 255), point, 8, 1)
+        current_idx = nav_system.get_current_waypoint_index()
+        if current_idx != route_overlay_wp_idx:
+            rebuild_route_overlay(current_idx)
+            route_overlay_wp_idx = current_idx
+        # Clamp the source rect to the overlay and shift the destination by
+        # the same amount so a viewport hanging off the map edge stays aligned
+        src_x, src_y = int(view_x), int(view_y)
+        view_surface.blit(route_overlay, (max(0, -src_x), max(0, -src_y)),
+                          (max(0, src_x), max(0, src_y), DRONE_VIEW_WIDTH, SCREEN_HEIGHT))
 
     # Draw drone icon in the center of the view
-    rotated_drone = pygame.transform.rotate(drone_icon, -drone.heading)
-    drone_rect = rotated_drone.get_rect(center=(DRONE_VIEW_WIDTH / 2, SCREEN_HEIGHT / 2))
-    screen.blit(rotated_drone, drone_rect.topleft)
+    heading_idx = int(drone.heading) % 360
+    view_surface.blit(rotated_drone_icons[heading_idx], rotated_drone_topleft[heading_idx])
 
-    # --- Vision System Logic (uses a snapshot from the map as camera feed) ---
-    # Always get the drone's camera view for UI display
-    snapshot_size = 500
-    crop_rect = pygame.Rect(0, 0, snapshot_size, snapshot_size)
-    crop_rect.center = (DRONE_VIEW_WIDTH // 2, SCREEN_HEIGHT // 2)
-    live_drone_view_surface = screen.subsurface(crop_rect).copy()
+    # Show the composed main view
+    screen.blit(view_surface, (0, 0))
 
+    # --- Vision System Logic (uses a snapshot from the map as camera feed) ---
     # We can attempt a match if hovering, or periodically if searching
     current_time = pygame.time.get_ticks() / 1000.0
     should_attempt_match = False
@@ -271,12 +327,17 @@ while running:
              print("Attempting to match waypoint...")
 
         current_waypoint_idx = nav_system.get_current_waypoint_index()
-        view_np = pygame.surfarray.array3d(live_drone_view_surface)
-        view_np = cv2.transpose(view_np)
-        view_np = cv2.cvtColor(view_np, cv2.COLOR_RGB2BGR)
+        # Go straight to grayscale in a single pass: pixels3d is a zero-copy
+        # (W, H, 3) RGB view of the crop, and the luma-weighted sum plus
+        # transpose yields the (H, W) gray image the matcher needs, skipping
+        # the old array3d -> transpose -> RGB2BGR -> BGR2GRAY chain.
+        view_px = pygame.surfarray.pixels3d(live_drone_view_surface)
+        camera_gray = (view_px[..., 0] * 0.299 + view_px[..., 1] * 0.587 +
+                       view_px[..., 2] * 0.114).astype(np.uint8).T
+        del view_px  # release the surface lock held by the pixel view
 
         snapshot_idx_to_match = current_waypoint_idx - 1
-        match_successful, confidence, _ = vision_system.match_waypoint(view_np, snapshot_idx_to_match)
+        match_successful, confidence, _ = vision_system.match_waypoint(camera_gray, snapshot_idx_to_match)
         last_match_confidence = confidence
 
         if match_successful:
@@ -294,28 +355,25 @@ while running:
     
     # A. Route Overview Panel
     screen.blit(route_overview_map, (info_panel_x, 0))
-    draw_route_on_overview(screen, env, nav_system, waypoints, drone, info_panel_x, map_rect)
+    draw_route_on_overview(screen, env, nav_system, drone, info_panel_x, map_rect)
 
     # B. Waypoint Snapshot Panel
     waypoint_panel_y = ROUTE_OVERVIEW_HEIGHT
     pygame.draw.rect(screen, (30, 30, 40), (info_panel_x, waypoint_panel_y, INFO_PANEL_WIDTH, WAYPOINT_VIEW_HEIGHT))
     
-    # Split the panel into two for side-by-side view
-    half_panel_width = INFO_PANEL_WIDTH // 2
-    img_size = (half_panel_width - 15, WAYPOINT_VIEW_HEIGHT - 40)
-
-    # Draw Target Waypoint Snapshot
+    # Draw Target Waypoint Snapshot (pre-scaled at load)
     target_wp_idx = nav_system.get_current_waypoint_index() - 1
-    if 0 <= target_wp_idx < len(ui_satellite_snapshots):
-        snapshot_img = ui_satellite_snapshots[target_wp_idx]
-        scaled_snapshot = pygame.transform.smoothscale(snapshot_img, img_size)
-        screen.blit(scaled_snapshot, (info_panel_x + 10, waypoint_panel_y + 30))
-        screen.blit(font_small.render("Target Waypoint", True, (255,255,255)), (info_panel_x + 10, waypoint_panel_y + 5))
-
-    # Draw Live Drone Camera View
-    scaled_live_view = pygame.transform.smoothscale(live_drone_view_surface, img_size)
+    if 0 <= target_wp_idx < len(ui_satellite_snapshots_scaled):
+        screen.blit(ui_satellite_snapshots_scaled[target_wp_idx], (info_panel_x + 10, waypoint_panel_y + 30))
+        screen.blit(LABEL_TARGET_WAYPOINT, (info_panel_x + 10, waypoint_panel_y + 5))
+
+    # Draw Live Drone Camera View. Plain scale: for a small thumbnail of an
+    # already-detailed view, nearest-neighbour downscaling is visually
+    # indistinguishable from smoothscale at a fraction of the cost.
+    if scaled_live_view is None or frame_count % LIVE_VIEW_REFRESH_FRAMES == 0:
+        scaled_live_view = pygame.transform.scale(live_drone_view_surface, img_size)
     screen.blit(scaled_live_view, (info_panel_x + half_panel_width + 5, waypoint_panel_y + 30))
-    screen.blit(font_small.render("Live Drone View", True, (255,255,255)), (info_panel_x + half_panel_width + 5, waypoint_panel_y + 5))
+    screen.blit(LABEL_LIVE_DRONE_VIEW, (info_panel_x + half_panel_width + 5, waypoint_panel_y + 5))
         
     # C. Status Info Panel
     status_panel_y = ROUTE_OVERVIEW_HEIGHT + WAYPOINT_VIEW_HEIGHT
@@ -323,6 +381,7 @@ while running:
     draw_status_text(screen, font_small, font_large, drone, nav_system, (info_panel_x, status_panel_y))
 
     pygame.display.flip()
+    frame_count += 1
 
 # --- Cleanup ---
 pygame.quit()
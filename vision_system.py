@@ -1,38 +1,109 @@
 import cv2
 import numpy as np
+import os
 import pygame
 from typing import Dict, Any
 
 class VisionSystem:
-    def __init__(self, satellite_snapshots):
+    # Both sides of every match are resized to this before ORB runs; feature
+    # detection cost scales with pixel count, and 256x256 keeps plenty of
+    # texture for 2000 keypoints at a quarter of the 500x500 pixel budget.
+    MATCH_SIZE = (256, 256)
+
+    # Good-match count that maps to confidence 1.0. Fewer keypoints survive
+    # at MATCH_SIZE than at the original 500x500 (roughly half as many good
+    # matches on the demo route), so the normalization is scaled to the
+    # reduced budget; retune this together with MATCH_SIZE.
+    CONFIDENCE_BASELINE_MATCHES = 50
+
+    def __init__(self, satellite_snapshots, snapshot_paths=None):
         self.satellite_snapshots = satellite_snapshots
+        # When the source file paths are known, ORB features are cached next
+        # to each snapshot and reloaded on later runs (see _preprocess_snapshots).
+        self.snapshot_paths = snapshot_paths
         self.orb = cv2.ORB_create(nfeatures=2000)
         
-        # Use FLANN-based matcher for better performance
-        FLANN_INDEX_LSH = 6
-        index_params = dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1)
-        search_params = dict(checks=50)
-        self.matcher = cv2.FlannBasedMatcher(index_params, search_params)
+        # Brute-force Hamming matcher: for ORB's binary descriptors at this
+        # feature count it beats FLANN-LSH (no index build, and the distance
+        # loop compiles down to popcount instructions), and crossCheck
+        # replaces the ratio test as the bad-match filter.
+        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
         self.waypoint_features = self._preprocess_snapshots()
         self.confidence_threshold = 0.25 # Requires a 25% match
 
     def _preprocess_snapshots(self):
         features = []
-        for snapshot_bgr in self.satellite_snapshots:
+        for i, snapshot_bgr in enumerate(self.satellite_snapshots):
             # The snapshots are already loaded as NumPy arrays (BGR format by cv2)
             snapshot_gray = cv2.cvtColor(snapshot_bgr, cv2.COLOR_BGR2GRAY)
-            
-            kp, des = self.orb.detectAndCompute(snapshot_gray, None)
+            snapshot_gray = cv2.resize(snapshot_gray, self.MATCH_SIZE, interpolation=cv2.INTER_AREA)
+
+            path = self.snapshot_paths[i] if self.snapshot_paths else None
+            kp, des = (self._load_cached_features(path) if path else (None, None))
+            if des is None:
+                kp, des = self.orb.detectAndCompute(snapshot_gray, None)
+                if path and des is not None:
+                    self._save_cached_features(path, kp, des)
             features.append({'kp': kp, 'des': des, 'img': snapshot_gray})
         print(f"Preprocessed features for {len(features)} waypoint snapshots.")
         return features
 
-    def match_waypoint(self, camera_np, waypoint_index):
+    @staticmethod
+    def _cache_path(path):
+        return path + '.orb.npz'
+
+    def _load_cached_features(self, path):
+        """
+        Load ORB keypoints/descriptors cached alongside a snapshot, or
+        (None, None) if there is no cache or the snapshot changed since it
+        was written.
+        """
+        cache_path = self._cache_path(path)
+        try:
+            if os.path.getmtime(cache_path) <= os.path.getmtime(path):
+                return None, None
+            with np.load(cache_path) as data:
+                kp = [cv2.KeyPoint(float(x), float(y), float(s), float(a), float(r))
+                      for (x, y), s, a, r in zip(data['pts'], data['sizes'],
+                                                 data['angles'], data['responses'])]
+                return kp, data['des']
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            # A cache truncated by a killed save (np.savez is not atomic)
+            # raises BadZipFile and would otherwise crash every launch until
+            # removed by hand; delete it so the features are recomputed.
+            print(f"Discarding unreadable ORB cache {cache_path}: {e}")
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+            return None, None
+
+    def _save_cached_features(self, path, kp, des):
+        try:
+            np.savez(self._cache_path(path),
+                     pts=np.array([p.pt for p in kp], dtype=np.float32),
+                     sizes=np.array([p.size for p in kp], dtype=np.float32),
+                     angles=np.array([p.angle for p in kp], dtype=np.float32),
+                     responses=np.array([p.response for p in kp], dtype=np.float32),
+                     des=des)
+        except OSError as e:
+            print(f"Could not cache ORB features for {path}: {e}")
+
+    def match_waypoint(self, camera_gray, waypoint_index, return_vis=False):
         """
         Match the drone's camera feed against a specific waypoint snapshot.
 
+        Args:
+            camera_gray: Single-channel grayscale image of the camera view.
+            waypoint_index: Index of the waypoint snapshot to match against.
+            return_vis: Build the match-visualization surface. Off by
+                default since rendering it costs more than the match itself.
+
         Returns:
-            (match_successful, confidence, processed_image_surface)
+            (match_successful, confidence, processed_image_surface) — the
+            surface is None unless return_vis is set.
         """
         if waypoint_index >= len(self.waypoint_features):
             return False, 0.0, None
@@ -45,53 +116,45 @@ class VisionSystem:
             return False, 0.0, None
 
         # 2. Process the live camera feed
-        # The input `camera_np` is already a BGR numpy array from simulation_main
-        camera_gray = cv2.cvtColor(camera_np, cv2.COLOR_BGR2GRAY)
+        # The caller hands over a ready grayscale image, so no color
+        # conversion is needed here; just resize to the common match size
+        camera_gray = cv2.resize(camera_gray, self.MATCH_SIZE, interpolation=cv2.INTER_AREA)
         kp_camera, des_camera = self.orb.detectAndCompute(camera_gray, None)
 
         if des_camera is None:
             return False, 0.0, None
 
-        # 3. Match features using KNN and apply Lowe's ratio test
-        matches = self.matcher.knnMatch(des_target, des_camera, k=2)
+        # 3. Match features; crossCheck already enforces mutual best matches,
+        # so a plain Hamming-distance cutoff stands in for the ratio test
+        matches = sorted(self.matcher.match(des_target, des_camera), key=lambda m: m.distance)
+        good_matches = [m for m in matches if m.distance < 60]
 
-        good_matches = []
-        for m, n in matches:
-            if m.distance < 0.7 * n.distance:
-                good_matches.append(m)
-
-        # 4. Calculate confidence
         # 4. Calculate confidence based on the number of good matches
         num_good_matches = len(good_matches)
         total_target_kp = len(kp_target)
-        confidence = (num_good_matches / 100) if total_target_kp > 0 else 0.0 # Normalize against a baseline of 100 good matches
+        confidence = (num_good_matches / self.CONFIDENCE_BASELINE_MATCHES) if total_target_kp > 0 else 0.0
 
         match_successful = confidence >= self.confidence_threshold
 
-        # 5. Create visualization
-        match_visualization = self._draw_matches(target_features['img'], kp_target, camera_gray, kp_camera, good_matches, match_successful)
-        
-        # Convert back to Pygame surface
-        match_visualization_rgb = cv2.cvtColor(match_visualization, cv2.COLOR_BGR2RGB)
-        processed_surface = pygame.surfarray.make_surface(match_visualization_rgb.transpose([1, 0, 2]))
+        # 5. Create visualization only on request; the simulation loop
+        # discards it, so by default none of this work happens
+        processed_surface = None
+        if return_vis:
+            match_visualization = self._draw_matches(target_features['img'], kp_target, camera_gray, kp_camera, good_matches, match_successful)
+
+            # Convert back to Pygame surface
+            match_visualization_rgb = cv2.cvtColor(match_visualization, cv2.COLOR_BGR2RGB)
+            processed_surface = pygame.surfarray.make_surface(match_visualization_rgb.transpose([1, 0, 2]))
 
         return match_successful, confidence, processed_surface
 
     def _draw_matches(self, img1, kp1, img2, kp2, matches, success):
         """Draws the feature matches for visualization."""
-        h, w = img1.shape
-        vis = np.zeros((h, w * 2, 3), np.uint8)
-        vis[:h, :w, 0] = img1
-        vis[:h, :w, 1] = img1
-        vis[:h, :w, 2] = img1
-        vis[:h, w:, 0] = img2
-        vis[:h, w:, 1] = img2
-        vis[:h, w:, 2] = img2
-
-        for m in matches:
-            pt1 = (int(kp1[m.queryIdx].pt[0]), int(kp1[m.queryIdx].pt[1]))
-            pt2 = (int(kp2[m.trainIdx].pt[0] + w), int(kp2[m.trainIdx].pt[1]))
-            color = (0, 255, 0) if success else (0, 0, 255)
-            cv2.line(vis, pt1, pt2, color, 1)
-
-        return vis
\ No newline at end of file
+        # cv2.drawMatches does the side-by-side composite, gray->color
+        # expansion and line drawing in one C++ pass, replacing the old
+        # Python-level channel broadcasts and per-match cv2.line loop.
+        return cv2.drawMatches(
+            img1, kp1, img2, kp2, matches, None,
+            matchColor=(0, 255, 0) if success else (0, 0, 255),
+            singlePointColor=None,
+            flags=cv2.DrawMatchesFlags_NOT_DRAW_SINGLE_POINTS)
\ No newline at end of file